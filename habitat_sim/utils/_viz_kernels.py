@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Facebook, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Numba kernels behind the depth and semantic conversions of viz_utils.
+
+viz_utils JIT compiles them on first use and caches the result on disk. The
+serial kernels can optionally be built ahead of time into the
+``_viz_kernels_aot`` extension module next to this file with::
+
+    python -m habitat_sim.utils._viz_kernels
+
+which skips their compile step in short lived processes. numba.pycc ignores
+prange and is pending deprecation, so viz_utils only uses the ahead of time
+kernels in place of the serial ones and keeps the parallel JIT kernels
+wherever those run. Prefer the default JIT path.
+"""
+
+import os
+
+import numba
+import numpy as np
+
+# number of colors in habitat_sim.utils.common.d3_40_colors_rgb, a compile time
+# constant so the modulo below is lowered to a multiply and shift
+NUM_SEMANTIC_COLORS = 40
+
+# signatures of the ahead of time compiled kernels
+DEPTH_TO_RGB_SIGNATURE = "void(f4[::1], f4, f4, u1[::1])"
+SEMANTIC_TO_RGB_SIGNATURE = "void(u4[::1], u1[:, ::1], u1[:, ::1])"
+
+
+@numba.njit(inline="always")
+def _depth_pixel(d, clip_max, scale):
+    # branchless clip and fixed scale into uint8
+    return np.uint8(min(max(d, np.float32(0.0)), clip_max) * scale)
+
+
+@numba.njit(inline="always")
+def _semantic_color(semantic_id, num_precomputed):
+    # the palette holds the wrapped color of every id below its length, so the
+    # common case is a single lookup; other ids fall back to the modulo
+    if 0 <= semantic_id < num_precomputed:
+        return np.intp(semantic_id)
+    return np.intp(semantic_id % NUM_SEMANTIC_COLORS)
+
+
+# The parallel and serial kernels are separate functions, rather than one
+# function compiled with and without parallel=True, because numba's on-disk
+# cache does not tell those builds apart.
+
+
+def depth_to_rgb(depth, clip_max, scale, rgb_depth):
+    for i in numba.prange(depth.shape[0]):
+        rgb_depth[i] = _depth_pixel(depth[i], clip_max, scale)
+
+
+def depth_to_rgb_serial(depth, clip_max, scale, rgb_depth):
+    for i in range(depth.shape[0]):
+        rgb_depth[i] = _depth_pixel(depth[i], clip_max, scale)
+
+
+def semantic_to_rgb(semantic, palette, rgb):
+    for i in numba.prange(semantic.shape[0]):
+        color = _semantic_color(semantic[i], palette.shape[0])
+        for j in range(rgb.shape[1]):
+            rgb[i, j] = palette[color, j]
+
+
+def semantic_to_rgb_serial(semantic, palette, rgb):
+    for i in range(semantic.shape[0]):
+        color = _semantic_color(semantic[i], palette.shape[0])
+        for j in range(rgb.shape[1]):
+            rgb[i, j] = palette[color, j]
+
+
+def compile_aot(output_dir=None):
+    from numba.pycc import CC
+
+    cc = CC("_viz_kernels_aot")
+    cc.output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    cc.export("depth_to_rgb", DEPTH_TO_RGB_SIGNATURE)(depth_to_rgb_serial)
+    cc.export("semantic_to_rgb", SEMANTIC_TO_RGB_SIGNATURE)(semantic_to_rgb_serial)
+    cc.compile()
+
+
+if __name__ == "__main__":
+    compile_aot()
@@ -1,24 +1,73 @@
-import base64
-import io
+import functools
 import os
 import subprocess
 import sys
+import tempfile
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 if "google.colab" in sys.modules:
     os.environ["IMAGEIO_FFMPEG_EXE"] = "/usr/bin/ffmpeg"
 
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import imageio
+import numba
 import numpy as np
+import PIL
 from PIL import Image
 from tqdm.auto import tqdm
 
+from habitat_sim.logging import logger
+from habitat_sim.utils import _viz_kernels
 from habitat_sim.utils.common import d3_40_colors_rgb
 
-
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    import PyNvVideoCodec as nvc
+except ImportError:
+    nvc = None
+
+try:
+    from habitat_sim.utils import _viz_kernels_aot
+except ImportError:
+    _viz_kernels_aot = None
+
+_SEMANTIC_PALETTE = np.ascontiguousarray(d3_40_colors_rgb, dtype=np.uint8)
+_NUM_SEMANTIC_COLORS = len(_SEMANTIC_PALETTE)
+# colors of semantic ids 0..4095 precomputed as id % 40, so common ids are
+# wrapped by indexing alone, without a modulo or a pass over the frame to
+# check the ids' range. A power of two bitmask cannot replace the modulo, it
+# would change the colors of ids from 40 up.
+_SEMANTIC_ID_PALETTE = _SEMANTIC_PALETTE[np.arange(4096) % _NUM_SEMANTIC_COLORS]
+# concurrent encode sessions allowed on consumer NVIDIA GPUs with recent
+# drivers, older drivers allow fewer, see HABITAT_MAX_NVENC_SESSIONS
+_MAX_NVENC_SESSIONS = 8
+# videos software encoded at once by save_videos, the encoders are
+# multithreaded themselves
+_MAX_SOFTWARE_ENCODES = 2
+# Pillow-SIMD releases are versioned as Pillow's with a .postN suffix
+_PILLOW_SIMD = ".post" in PIL.__version__
+_logged_stock_pillow = False
+# videos larger than this are displayed by path rather than inlined in the page
+_MAX_EMBEDDED_VIDEO_BYTES = 2_000_000
+
+# frames make_video prepares at once, twice as many are held in memory
+_MAX_FRAME_WORKERS = 8
+# observation types make_video can turn into frames
+_OBSERVATION_TYPES = ("color", "depth", "semantic")
+
+
+@functools.lru_cache(maxsize=1)
 def is_notebook():
-    """This utility function detects if the code is running in a notebook
+    """This utility function detects if the code is running in a notebook.
+    The result is computed once per process.
     """
     try:
         get_ipython = sys.modules["IPython"].get_ipython
@@ -32,17 +81,168 @@ def is_notebook():
         return True
 
 
+@functools.lru_cache(maxsize=None)
+def _can_encode_with(codec: str) -> bool:
+    """Probes whether the ffmpeg used by imageio can encode a frame with the
+    given codec on this machine. Hardware encoders are usually compiled into
+    ffmpeg, so this also checks that a supported GPU is present.
+    """
+    try:
+        import imageio_ffmpeg
+
+        result = subprocess.run(
+            [
+                imageio_ffmpeg.get_ffmpeg_exe(),
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-f",
+                "lavfi",
+                "-i",
+                "color=size=256x256",
+                "-frames:v",
+                "1",
+                "-c:v",
+                codec,
+                "-f",
+                "null",
+                "-",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=30,
+        )
+    except (ImportError, OSError, RuntimeError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+def _get_hardware_video_codec() -> Optional[str]:
+    """Returns the ffmpeg hardware video codec to encode with, or None to use
+    software encoding. The HABITAT_VIDEO_CODEC environment variable selects a
+    codec explicitly (e.g. "hevc_nvenc", "h264_amf" or "hevc_amf"), otherwise
+    h264_nvenc is used if it works on this machine, unless
+    HABITAT_DISABLE_NVENC is set. The probe runs once per process.
+    """
+    codec = os.environ.get("HABITAT_VIDEO_CODEC")
+    if codec:
+        return codec
+    if os.environ.get("HABITAT_DISABLE_NVENC"):
+        return None
+    return "h264_nvenc" if _can_encode_with("h264_nvenc") else None
+
+
+def _create_nvenc_encoder(width: int, height: int, fps: int):
+    # shared by the probe and _PyNvEncWriter, so the probe covers the settings
+    # videos are encoded with
+    return nvc.CreateEncoder(
+        width, height, "ABGR", True, codec="h264", preset="P4", fps=fps
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _can_encode_with_pynvvideocodec() -> bool:
+    """Probes whether PyNvVideoCodec can encode a frame on this machine, the
+    module imports fine without a supported GPU or driver.
+    """
+    try:
+        encoder = _create_nvenc_encoder(256, 256, fps=60)
+        encoder.Encode(np.zeros(256 * 256 * 4, dtype=np.uint8))
+        encoder.EndEncode()
+    except Exception:
+        return False
+    return True
+
+
+def _use_pynvvideocodec() -> bool:
+    return (
+        nvc is not None
+        and not os.environ.get("HABITAT_VIDEO_CODEC")
+        and not os.environ.get("HABITAT_DISABLE_NVENC")
+        and _can_encode_with_pynvvideocodec()
+    )
+
+
+def _remove_stream(stream) -> None:
+    stream.close()
+    try:
+        os.remove(stream.name)
+    except FileNotFoundError:
+        pass
+
+
+class _PyNvEncWriter:
+    """Writer with the append_data / close interface of imageio's writers that
+    encodes frames with NVENC through PyNvVideoCodec, skipping the per-frame
+    pipe to an ffmpeg subprocess. The H.264 stream is muxed into the output
+    container with a single ffmpeg stream copy on close.
+    """
+
+    def __init__(self, video_file: str, fps: int = 60):
+        self._video_file = video_file
+        self._fps = fps
+        self._encoder = None
+        # persistent RGBA upload buffer, NVENC's "ABGR" format in byte order
+        self._rgba = None
+        self._stream = None
+        self._remove_stream = None
+
+    def append_data(self, im: np.ndarray):
+        if self._encoder is None:
+            self._stream = tempfile.NamedTemporaryFile(suffix=".h264", delete=False)
+            # removes the stream if the writer is dropped without being closed
+            self._remove_stream = weakref.finalize(self, _remove_stream, self._stream)
+            height, width = im.shape[:2]
+            self._encoder = _create_nvenc_encoder(width, height, self._fps)
+            self._rgba = np.full((height, width, 4), 255, dtype=np.uint8)
+        if im.ndim == 2:
+            self._rgba[..., :3] = im[..., np.newaxis]
+        else:
+            self._rgba[..., :3] = im[..., :3]
+        self._stream.write(self._encoder.Encode(self._rgba.reshape(-1)))
+
+    def close(self):
+        import imageio_ffmpeg
+
+        if self._encoder is None:
+            return
+        try:
+            self._stream.write(self._encoder.EndEncode())
+            self._stream.close()
+            subprocess.run(
+                [
+                    imageio_ffmpeg.get_ffmpeg_exe(),
+                    "-y",
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-framerate",
+                    str(self._fps),
+                    "-i",
+                    self._stream.name,
+                    "-c",
+                    "copy",
+                    self._video_file,
+                ],
+                check=True,
+            )
+        finally:
+            self._remove_stream()
+
+
 def get_fast_video_writer(video_file: str, fps: int = 60):
-    if (
-        "google.colab" in sys.modules
-        and os.path.splitext(video_file)[-1] == ".mp4"
-        and os.environ.get("IMAGEIO_FFMPEG_EXE") == "/usr/bin/ffmpeg"
-    ):
+    codec = None
+    if os.path.splitext(video_file)[-1] == ".mp4":
+        if _use_pynvvideocodec():
+            # Encode directly with NVENC, no ffmpeg pipe per frame
+            return _PyNvEncWriter(video_file, fps=fps)
+        codec = _get_hardware_video_codec()
+    if codec is not None:
         # USE GPU Accelerated Hardware Encoding
         writer = imageio.get_writer(
             video_file,
             fps=fps,
-            codec="h264_nvenc",
+            codec=codec,
             mode="I",
             bitrate="1000k",
             format="FFMPEG",
@@ -55,18 +255,68 @@ def get_fast_video_writer(video_file: str, fps: int = 60):
     return writer
 
 
+def _progressbar_disabled() -> bool:
+    # no progressbar in headless runs, where it only adds overhead and log spam
+    # sys.stderr is None under pythonw and some daemonized runners
+    return "HABITAT_QUIET" in os.environ or not (
+        is_notebook() or (sys.stderr is not None and sys.stderr.isatty())
+    )
+
+
+def _write_video(video_file: str, frames, fps: int, progressbar: bool):
+    writer = get_fast_video_writer(video_file, fps=fps)
+    for ob in tqdm(
+        frames, desc="Encoding video:%s" % video_file, disable=not progressbar
+    ):
+        writer.append_data(ob)
+    writer.close()
+
+
 def save_video(video_file: str, frames, fps: int = 60):
-    """Saves the video using imageio. Will try to use GPU hardware encoding on
-    Google Colab for faster video encoding. Will also display a progressbar.
+    """Saves the video using imageio. Will try to use GPU hardware encoding
+    when available for faster video encoding. Will also display a progressbar
+    in notebooks and terminals unless HABITAT_QUIET is set.
 
     :param video_file: the file name of where to save the video
     :param frames: the actual frame objects to save
     :param fps: the fps of the video (default 60)
     """
-    writer = get_fast_video_writer(video_file, fps=fps)
-    for ob in tqdm(frames, desc="Encoding video:%s" % video_file):
-        writer.append_data(ob)
-    writer.close()
+    _write_video(video_file, frames, fps, progressbar=not _progressbar_disabled())
+
+
+def save_videos(
+    jobs: List[Tuple[str, Iterable[np.ndarray]]],
+    fps: int = 60,
+    max_workers: Optional[int] = None,
+):
+    """Saves several videos concurrently, e.g. one per episode, so that
+    encoder start-up and the encoding itself overlap across videos instead of
+    running back to back. A single progressbar counts the finished videos.
+
+    :param jobs: list of (video_file, frames) pairs, as passed to save_video
+    :param fps: the fps of the videos (default 60)
+    :param max_workers: number of videos encoded at once. Defaults to the
+        number of concurrent NVENC sessions when hardware encoding is used,
+        8 or the HABITAT_MAX_NVENC_SESSIONS environment variable for drivers
+        that allow fewer, otherwise to 2.
+    """
+    if max_workers is None:
+        if _use_pynvvideocodec() or _get_hardware_video_codec() is not None:
+            max_workers = int(
+                os.environ.get("HABITAT_MAX_NVENC_SESSIONS", _MAX_NVENC_SESSIONS)
+            )
+        else:
+            max_workers = _MAX_SOFTWARE_ENCODES
+    max_workers = max(1, min(len(jobs), max_workers))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_write_video, video_file, frames, fps, False)
+            for video_file, frames in jobs
+        ]
+        for future in tqdm(
+            futures, desc="Encoding videos", disable=_progressbar_disabled()
+        ):
+            future.result()
 
 
 def display_video(video_file: str, height: int = 400):
@@ -80,18 +330,28 @@ def display_video(video_file: str, height: int = 400):
     # Check if in notebook
     if is_notebook():
         from IPython import display as ipythondisplay
-        from IPython.display import HTML
-
-        ext = os.path.splitext(video_file)[-1][1:]
-        video = io.open(video_file, "r+b").read()
+        from IPython.display import Video
+
+        # Only small videos are inlined as base64, larger ones are referenced
+        # by a path relative to the notebook. Colab cannot serve local files
+        # and Jupyter only serves files under its working directory, so the
+        # others are embedded.
+        try:
+            relative_file = os.path.relpath(video_file)
+        except ValueError:  # on another drive on Windows
+            relative_file = None
+        embed = (
+            "google.colab" in sys.modules
+            or os.path.getsize(video_file) < _MAX_EMBEDDED_VIDEO_BYTES
+            or relative_file is None
+            or relative_file.split(os.sep)[0] == os.pardir
+        )
         ipythondisplay.display(
-            HTML(
-                data="""<video alt="test" autoplay
-          loop controls style="height: {2}px;">
-          <source src="data:video/{1}';base64,{0}" type="video/{1}" />
-          </video>""".format(
-                    base64.b64encode(video).decode("ascii"), ext, height
-                )
+            Video(
+                video_file if embed else relative_file,
+                embed=embed,
+                height=height,
+                html_attributes="autoplay loop controls",
             )
         )
     else:
@@ -102,8 +362,137 @@ def display_video(video_file: str, height: int = 400):
             subprocess.call([opener, video_file])
 
 
+class _FrameError(Exception):
+    pass
+
+
+def _prepare_frame(
+    ob,
+    primary_obs: str,
+    primary_obs_type: str,
+    overlay_meta,
+    video_dims: Optional[Tuple[int]],
+    depth_clip: Optional[float],
+    scratch: threading.local,
+) -> np.ndarray:
+    # raises _FrameError if the frame cannot be built, make_video reports it
+    primary_image = ob[primary_obs]
+    if primary_obs_type not in _OBSERVATION_TYPES:
+        raise _FrameError(
+            "make_video_new : Aborting, primary image processing failed, "
+            'unsupported observation type "' + primary_obs_type + '".'
+        )
+    if not overlay_meta and video_dims is None:
+        # nothing to composite, hand the observation data straight to the
+        # encoder without a round trip through PIL
+        return observation_to_ndarray(primary_image, primary_obs_type)
+
+    # primary image processing, depth is converted into a per-thread scratch
+    # buffer as it is copied into the frame right away
+    primary_rgb = observation_to_ndarray(
+        primary_image,
+        primary_obs_type,
+        depth_out=_depth_scratch(scratch, primary_obs, primary_obs_type, primary_image),
+    )
+    frame = np.empty(primary_rgb.shape[:2] + (3,), dtype=np.uint8)
+    frame[...] = _rgb_view(primary_rgb)
+
+    # overlay images from provided settings
+    for ov_obs, ov_type, border_frame, border_pos, ov_pos, ov_dims in overlay_meta:
+        if ov_type not in _OBSERVATION_TYPES:
+            raise _FrameError(
+                'make_video_new : Aborting, overlay image processing failed on "'
+                + ov_obs
+                + '", unsupported observation type "'
+                + ov_type
+                + '".'
+            )
+        overlay_rgb = observation_to_ndarray(
+            ob[ov_obs],
+            ov_type,
+            depth_clip,
+            depth_out=_depth_scratch(scratch, ov_obs, ov_type, ob[ov_obs]),
+        )
+        _paste(frame, border_frame, border_pos)
+        _paste(frame, _resize(overlay_rgb, ov_dims), ov_pos)
+
+    if video_dims is not None:
+        frame = _resize(frame, video_dims)
+
+    return frame
+
+
+def _depth_scratch(
+    scratch: threading.local, obs: str, obs_type: str, image: np.ndarray
+) -> Optional[np.ndarray]:
+    # reuses one uint8 buffer per depth observation key and worker thread
+    if obs_type != "depth":
+        return None
+    if not hasattr(scratch, "depth"):
+        scratch.depth = {}
+    buffer = scratch.depth.get(obs)
+    if buffer is None or buffer.shape != image.shape:
+        buffer = scratch.depth[obs] = np.empty(image.shape, dtype=np.uint8)
+    return buffer
+
+
+def _rgb_view(image: np.ndarray) -> np.ndarray:
+    # grayscale images broadcast over the color channels, alpha is dropped
+    if image.ndim == 2:
+        return image[..., np.newaxis]
+    return image[..., :3]
+
+
+def _resize(image: np.ndarray, dims: Tuple[int, int]) -> np.ndarray:
+    # dims are (width, height), like PIL
+    if cv2 is not None:
+        return cv2.resize(image, tuple(dims), interpolation=cv2.INTER_AREA)
+    global _logged_stock_pillow
+    if not _PILLOW_SIMD and not _logged_stock_pillow:
+        _logged_stock_pillow = True
+        logger.info(
+            "make_video is resizing frames with stock Pillow, install "
+            "opencv-python or pillow-simd for faster video generation."
+        )
+    # Pillow-SIMD accelerates LANCZOS the most, stock Pillow is much faster
+    # with BILINEAR
+    resample = Image.LANCZOS if _PILLOW_SIMD else Image.BILINEAR
+    return np.asarray(Image.fromarray(image).resize(tuple(dims), resample))
+
+
+def _paste(frame: np.ndarray, image: np.ndarray, pos: Tuple[int, int]):
+    # copies image into frame with its top left corner at pos (x, y),
+    # clipped to the frame bounds like PIL's Image.paste
+    x, y = pos
+    x0, y0 = max(x, 0), max(y, 0)
+    x1 = min(x + image.shape[1], frame.shape[1])
+    y1 = min(y + image.shape[0], frame.shape[0])
+    if x0 < x1 and y0 < y1:
+        frame[y0:y1, x0:x1] = _rgb_view(image[y0 - y : y1 - y, x0 - x : x1 - x])
+
+
+def _prefetch_in_order(
+    executor: ThreadPoolExecutor, fn: Callable, items: Iterable, max_pending: int
+) -> Iterator:
+    """Yields fn(item) for every item, in order, while up to max_pending
+    calls run ahead on the executor. Closing the generator cancels the calls
+    that have not started yet.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
 def make_video(
-    observations: List[np.ndarray],
+    observations: Iterable[Dict[str, np.ndarray]],
     primary_obs: str,
     primary_obs_type: str,
     video_file: str,
@@ -115,7 +504,7 @@ def make_video(
 ):
     """Build a video from a passed observations array, with some images optionally overlayed.
 
-    :param observations: List of observations from which the video should be constructed.
+    :param observations: Observations from which the video should be constructed. Any iterable, e.g. a generator, is streamed frame by frame.
     :param primary_obs: Sensor name in observations to be used for primary video images.
     :param primary_obs_type: Primary image observation type ("color", "depth", "semantic" supported).
     :param video_file: File to save resultant .mp4 video.
@@ -133,8 +522,6 @@ def make_video(
         "border_color": overlay image border color [0-255] (3d: array, list, or tuple). Defaults to gray [150]\n
         "obs": observation key (string)\n
     """
-    videodims = observations[0][primary_obs].shape
-    videodims = (videodims[1], videodims[0])  # flip to w,h order
     if not video_file.endswith(".mp4"):
         video_file = video_file + ".mp4"
     print("Encoding the video: %s " % video_file)
@@ -156,61 +543,149 @@ def make_video(
             if "border_color" in overlay:
                 border_color = np.asarray(overlay["border_color"])
             border_image[:, :] = border_color
-            border_frames.append(observation_to_image(border_image, "color"))
-
-    for ob in observations:
-        # primary image processing
-        image_frame = observation_to_image(ob[primary_obs], primary_obs_type)
-        if image_frame is None:
-            print("make_video_new : Aborting, primary image processing failed.")
-            return
+            border_frames.append(border_image)
+
+    # hoist the per-overlay lookups and box math out of the frame loop
+    overlay_meta = [
+        (
+            overlay["obs"],
+            overlay["type"],
+            border_frames[ov_ix],
+            (
+                overlay["pos"][0] - overlay["border"],
+                overlay["pos"][1] - overlay["border"],
+            ),
+            tuple(overlay["pos"]),
+            tuple(overlay["dims"]),
+        )
+        for ov_ix, overlay in enumerate(overlay_settings or [])
+    ]
 
-        # overlay images from provided settings
-        if overlay_settings is not None:
-            for ov_ix, overlay in enumerate(overlay_settings):
-                overlay_rgb_img = observation_to_image(
-                    ob[overlay["obs"]], overlay["type"], depth_clip
-                )
-                if overlay_rgb_img is None:
-                    print(
-                        'make_video_new : Aborting, overlay image processing failed on "'
-                        + overlay["obs"]
-                        + '".'
-                    )
-                    return
-                overlay_rgb_img = overlay_rgb_img.resize(overlay["dims"])
-                image_frame.paste(
-                    border_frames[ov_ix],
-                    box=(
-                        overlay["pos"][0] - overlay["border"],
-                        overlay["pos"][1] - overlay["border"],
-                    ),
-                )
-                image_frame.paste(overlay_rgb_img, box=overlay["pos"])
-
-        if video_dims is not None:
-            image_frame = image_frame.resize(video_dims)
-
-        # write the desired image to video
-        writer.append_data(np.array(image_frame))
+    if primary_obs_type == "color" and not overlay_meta and video_dims is None:
+        # nothing to convert or composite, feed the encoder directly
+        for ob in observations:
+            writer.append_data(observation_to_ndarray(ob[primary_obs], "color"))
+    else:
+        # prepare frames on worker threads while this thread feeds the encoder,
+        # keeping a bounded number of frames in flight
+        num_workers = min(os.cpu_count() or 1, _MAX_FRAME_WORKERS)
+        scratch = threading.local()
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            frames = _prefetch_in_order(
+                executor,
+                lambda ob: _prepare_frame(
+                    ob,
+                    primary_obs,
+                    primary_obs_type,
+                    overlay_meta,
+                    video_dims,
+                    depth_clip,
+                    scratch,
+                ),
+                observations,
+                2 * num_workers,
+            )
+            try:
+                for frame in frames:
+                    # write the desired image to video
+                    writer.append_data(frame)
+            except _FrameError as e:
+                frames.close()
+                writer.close()
+                print(e)
+                return
 
     writer.close()
     if open_vid:
         display_video(video_file)
 
 
-def depth_to_rgb(depth_image: np.ndarray, clip_max: float = 10.0) -> np.ndarray:
+# the JIT compiled kernels are cached on disk, so only the first process pays
+# for compiling them, unless they were built ahead of time
+_depth_to_rgb = numba.njit(parallel=True, fastmath=True, cache=True)(
+    _viz_kernels.depth_to_rgb
+)
+_semantic_to_rgb = numba.njit(parallel=True, cache=True)(_viz_kernels.semantic_to_rgb)
+_depth_to_rgb_serial = numba.njit(fastmath=True, cache=True)(
+    _viz_kernels.depth_to_rgb_serial
+)
+_semantic_to_rgb_serial = numba.njit(cache=True)(_viz_kernels.semantic_to_rgb_serial)
+
+
+@functools.lru_cache(maxsize=1)
+def _tbb_threading_layer() -> bool:
+    # mirrors numba's choice of threading layer, TBB is picked first whenever
+    # it is installed unless another layer was requested
+    layer = numba.config.THREADING_LAYER
+    if layer == "default":
+        # older numba releases have no configurable priority
+        layer = getattr(
+            numba.config, "THREADING_LAYER_PRIORITY", ["tbb", "omp", "workqueue"]
+        )[0]
+    if layer not in ("tbb", "safe", "threadsafe", "forksafe"):
+        return False
+    try:
+        from numba.np.ufunc import tbbpool  # noqa: F401
+    except ImportError:
+        try:
+            # numba < 0.49
+            from numba.npyufunc import tbbpool  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+def _kernel(parallel_kernel, serial_kernel):
+    # under numba's TBB threading layer, parallel kernels hang interpreter exit
+    # when launched from threads other than the main one, e.g. the make_video
+    # workers, and when a process is forked afterwards, which the ffmpeg
+    # writers do. Those cases run the serial builds, or the ahead of time ones,
+    # which are serial too; make_video already spreads frames across its
+    # workers.
+    if (
+        threading.current_thread() is threading.main_thread()
+        and not _tbb_threading_layer()
+    ):
+        return parallel_kernel
+    return serial_kernel
+
+
+def depth_to_rgb(
+    depth_image: np.ndarray,
+    clip_max: float = 10.0,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
     """Normalize depth image into [0, 1] and convert to grayscale rgb
 
     :param depth_image: Raw depth observation image from sensor output.
     :param clip_max: Max depth distance for clipping and normalization.
+    :param out: Optional C-contiguous uint8 array with the shape of depth_image
+        to write the result into, e.g. a buffer reused across frames.
 
     :return: Clipped grayscale depth image data.
     """
-    d_im = np.clip(depth_image, 0, clip_max)
-    d_im /= clip_max
-    rgb_d_im = (d_im * 255).astype(np.uint8)
-    return rgb_d_im
+    if out is None:
+        out = np.empty(depth_image.shape, dtype=np.uint8)
+    elif (
+        out.shape != depth_image.shape
+        or out.dtype != np.uint8
+        or not out.flags.c_contiguous
+    ):
+        raise ValueError(
+            "depth_to_rgb : out must be a C-contiguous uint8 array of shape "
+            + str(depth_image.shape)
+        )
+    args = (
+        np.ascontiguousarray(depth_image, dtype=np.float32).reshape(-1),
+        np.float32(clip_max),
+        np.float32(255.0 / clip_max),
+        out.reshape(-1),
+    )
+    serial_kernel = _depth_to_rgb_serial
+    if _viz_kernels_aot is not None:
+        serial_kernel = _viz_kernels_aot.depth_to_rgb
+    _kernel(_depth_to_rgb, serial_kernel)(*args)
+    return out
 
 
 def semantic_to_rgb(semantic_image: np.ndarray) -> np.ndarray:
@@ -220,35 +695,38 @@ def semantic_to_rgb(semantic_image: np.ndarray) -> np.ndarray:
 
     :return: rgb semantic image data.
     """
-    semantic_image_rgb = Image.new(
-        "P", (semantic_image.shape[1], semantic_image.shape[0])
-    )
-    semantic_image_rgb.putpalette(d3_40_colors_rgb.flatten())
-    semantic_image_rgb.putdata((semantic_image.flatten() % 40).astype(np.uint8))
-    semantic_image_rgb = semantic_image_rgb.convert("RGBA")
-    return semantic_image_rgb
-
-
-def observation_to_image(
+    semantic = np.ascontiguousarray(semantic_image).reshape(-1)
+    rgb = np.empty(semantic_image.shape + (3,), dtype=np.uint8)
+    args = (semantic, _SEMANTIC_ID_PALETTE, rgb.reshape(-1, 3))
+    serial_kernel = _semantic_to_rgb_serial
+    # the ahead of time build covers the uint32 ids semantic sensors produce
+    if _viz_kernels_aot is not None and semantic.dtype == np.uint32:
+        serial_kernel = _viz_kernels_aot.semantic_to_rgb
+    _kernel(_semantic_to_rgb, serial_kernel)(*args)
+    return rgb
+
+
+def observation_to_ndarray(
     observation_image: np.ndarray,
     observation_type: str,
     depth_clip: Optional[float] = 10.0,
-):
-    """Generate an rgb image from a sensor observation. Supported types are: "color", "depth", "semantic"
+    depth_out: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """Generate uint8 image data from a sensor observation. Supported types are: "color", "depth", "semantic"
 
     :param observation_image: Raw observation image from sensor output.
     :param observation_type: Observation type ("color", "depth", "semantic" supported)
     :param depth_clip: Defines default depth clip normalization for all depth images.
+    :param depth_out: Optional buffer the converted depth image is written to, see depth_to_rgb.
 
-    :return: PIL Image object or None if fails.
+    :return: uint8 image data or None if fails.
     """
     rgb_image = None
     if observation_type == "color":
-        rgb_image = Image.fromarray(np.uint8(observation_image))
+        # only copies if the data is not already contiguous uint8
+        rgb_image = np.ascontiguousarray(observation_image, dtype=np.uint8)
     elif observation_type == "depth":
-        rgb_image = Image.fromarray(
-            depth_to_rgb(observation_image, clip_max=depth_clip)
-        )
+        rgb_image = depth_to_rgb(observation_image, clip_max=depth_clip, out=depth_out)
     elif observation_type == "semantic":
         rgb_image = semantic_to_rgb(observation_image)
     else:
@@ -257,3 +735,22 @@ def observation_to_image(
             + observation_type
         )
     return rgb_image
+
+
+def observation_to_image(
+    observation_image: np.ndarray,
+    observation_type: str,
+    depth_clip: Optional[float] = 10.0,
+):
+    """Generate an rgb image from a sensor observation. Supported types are: "color", "depth", "semantic"
+
+    :param observation_image: Raw observation image from sensor output.
+    :param observation_type: Observation type ("color", "depth", "semantic" supported)
+    :param depth_clip: Defines default depth clip normalization for all depth images.
+
+    :return: PIL Image object or None if fails.
+    """
+    rgb_image = observation_to_ndarray(observation_image, observation_type, depth_clip)
+    if rgb_image is None:
+        return None
+    return Image.fromarray(rgb_image)
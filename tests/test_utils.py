@@ -4,8 +4,203 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import gc
+import importlib
+import os
+import subprocess
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import imageio
+import numpy as np
+import pytest
+
+from habitat_sim.utils import viz_utils as vut
 from habitat_sim.utils.collect_env import main as collect_env
+from habitat_sim.utils.common import d3_40_colors_rgb
 
 
 def test_collect_env():
     collect_env()
+
+
+def test_make_video_exits(tmp_path):
+    # make_video converts depth and semantic frames on worker threads, which
+    # must not keep the interpreter from exiting
+    script = """
+import sys
+
+import numpy as np
+
+from habitat_sim.utils import viz_utils as vut
+
+vut.depth_to_rgb(np.ones((8, 8), dtype=np.float32))
+observations = [
+    {
+        "depth": np.random.rand(64, 64).astype(np.float32),
+        "semantic": np.random.randint(100, size=(64, 64), dtype=np.uint32),
+    }
+    for _ in range(8)
+]
+vut.make_video(
+    observations,
+    "depth",
+    "depth",
+    sys.argv[1],
+    open_vid=False,
+    overlay_settings=[
+        {
+            "obs": "semantic",
+            "type": "semantic",
+            "dims": (16, 16),
+            "pos": (0, 0),
+            "border": 1,
+        }
+    ],
+)
+"""
+    subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path / "video")],
+        check=True,
+        timeout=300,
+    )
+    assert (tmp_path / "video.mp4").exists()
+
+
+def test_save_videos(tmp_path):
+    jobs = [
+        (
+            str(tmp_path / ("video%d.mp4" % i)),
+            [np.full((32, 32, 3), 10 * j, dtype=np.uint8) for j in range(num_frames)],
+        )
+        for i, num_frames in enumerate([3, 5])
+    ]
+    vut.save_videos(jobs, fps=10)
+    for video_file, frames in jobs:
+        with imageio.get_reader(video_file) as reader:
+            assert reader.count_frames() == len(frames)
+
+
+DEPTH = np.array([[-1.0, 0.0, 2.5], [5.0, 10.0, 20.0]], dtype=np.float32)
+SEMANTIC = np.array([[0, 1, 39], [40, 4095, 100000]], dtype=np.uint32)
+
+
+def test_depth_to_rgb_out():
+    depth = DEPTH
+    out = np.zeros(depth.shape, dtype=np.uint8)
+    assert vut.depth_to_rgb(depth, clip_max=10.0, out=out) is out
+    assert np.array_equal(out, [[0, 0, 63], [127, 255, 255]])
+
+    for bad_out in [
+        np.zeros((3, 2), dtype=np.uint8),
+        np.zeros(depth.shape, dtype=np.float32),
+        np.zeros((2, 6), dtype=np.uint8)[:, ::2],
+    ]:
+        with pytest.raises(ValueError):
+            vut.depth_to_rgb(depth, out=bad_out)
+
+
+def test_make_video_generator(tmp_path):
+    observations = (
+        {"rgba": np.full((32, 32, 4), 20 * i, dtype=np.uint8)} for i in range(6)
+    )
+    vut.make_video(
+        observations, "rgba", "color", str(tmp_path / "video"), open_vid=False
+    )
+    with imageio.get_reader(str(tmp_path / "video.mp4")) as reader:
+        assert reader.count_frames() == 6
+
+
+def test_semantic_to_rgb():
+    semantic = SEMANTIC
+    rgb = vut.semantic_to_rgb(semantic)
+    assert isinstance(rgb, np.ndarray)
+    assert rgb.shape == (2, 3, 3)
+    assert rgb.dtype == np.uint8
+    assert np.array_equal(rgb, d3_40_colors_rgb[semantic % 40])
+
+
+class _FakeNvEncoder:
+    def __init__(self):
+        self.frames = []
+
+    def Encode(self, rgba):
+        self.frames.append(rgba.copy())
+        return b"frame"
+
+    def EndEncode(self):
+        return b"end"
+
+
+def test_pynvenc_writer(tmp_path, monkeypatch):
+    encoder = _FakeNvEncoder()
+    settings = []
+
+    def create_encoder(width, height, *args, **kwargs):
+        settings.append((args, kwargs))
+        return encoder
+
+    monkeypatch.setattr(vut, "nvc", types.SimpleNamespace(CreateEncoder=create_encoder))
+    # the probe checks the settings videos are encoded with
+    assert vut._can_encode_with_pynvvideocodec.__wrapped__()
+    encoder.frames.clear()
+    muxed = []
+
+    def mux(args, **kwargs):
+        with open(args[args.index("-i") + 1], "rb") as stream:
+            muxed.append(stream.read())
+
+    monkeypatch.setattr(vut.subprocess, "run", mux)
+
+    writer = vut._PyNvEncWriter(str(tmp_path / "video.mp4"))
+    gray = np.full((2, 2), 7, dtype=np.uint8)
+    rgb = np.full((2, 2, 3), (1, 2, 3), dtype=np.uint8)
+    rgba = np.full((2, 2, 4), (4, 5, 6, 0), dtype=np.uint8)
+    for im in [gray, rgb, rgba]:
+        writer.append_data(im)
+    stream_file = writer._stream.name
+    writer.close()
+
+    assert settings[0] == settings[1]
+
+    # frames are uploaded as opaque RGBA
+    for frame, expected in zip(
+        encoder.frames, [(7, 7, 7, 255), (1, 2, 3, 255), (4, 5, 6, 255)]
+    ):
+        assert np.array_equal(frame.reshape(2, 2, 4), np.full((2, 2, 4), expected))
+    assert muxed == [b"frameframeframeend"]
+    assert not os.path.exists(stream_file)
+
+    # a writer dropped without being closed removes its stream too
+    writer = vut._PyNvEncWriter(str(tmp_path / "video.mp4"))
+    writer.append_data(rgb)
+    stream_file = writer._stream.name
+    del writer
+    gc.collect()
+    assert not os.path.exists(stream_file)
+
+
+def test_viz_kernels_aot(tmp_path, monkeypatch):
+    pytest.importorskip("numba.pycc")
+    from habitat_sim.utils import _viz_kernels
+
+    _viz_kernels.compile_aot(str(tmp_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    aot = importlib.import_module("_viz_kernels_aot")
+
+    def convert():
+        return (
+            vut.depth_to_rgb(DEPTH, clip_max=10.0),
+            vut.semantic_to_rgb(SEMANTIC),
+        )
+
+    # the ahead of time kernels stand in for the serial ones, which run on
+    # threads other than the main one
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        monkeypatch.setattr(vut, "_viz_kernels_aot", None)
+        jit_depth, jit_semantic = executor.submit(convert).result()
+        monkeypatch.setattr(vut, "_viz_kernels_aot", aot)
+        aot_depth, aot_semantic = executor.submit(convert).result()
+    assert np.array_equal(aot_depth, jit_depth)
+    assert np.array_equal(aot_semantic, jit_semantic)